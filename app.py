@@ -1,9 +1,8 @@
 import streamlit as st
 from supabase import create_client
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import requests
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 
 # =======================================================================
 # 1️⃣ SETUP
@@ -13,196 +12,440 @@ st.title("🚀 Talent Match Intelligence System")
 st.caption("Menemukan talenta terbaik berdasarkan benchmark, kompetensi, dan insight AI (Gemini 2.5).")
 
 # =======================================================================
-# 2️⃣ KONEKSI SUPABASE
+# 2️⃣ KONEKSI SUPABASE & GEMINI
 # =======================================================================
+@st.cache_resource
+def get_supabase():
+    # Satu client per proses: koneksi HTTP (keep-alive) dipakai ulang di setiap rerun
+    return create_client(st.secrets["SUPABASE_URL"], st.secrets["SUPABASE_KEY"])
+
+@st.cache_resource
+def get_http():
+    # Session HTTP untuk Gemini; koneksi TCP/TLS (keep-alive) bertahan lintas prompt & rerun
+    # requests baru di-import saat AI pertama kali dipanggil, bukan di setiap rerun form
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    # POST generateContent TIDAK idempoten (tiap panggilan ditagih), jadi retry dibatasi:
+    # - gagal konek (request belum terkirim) -> diulang; gagal baca (mungkin sudah diproses) -> tidak
+    # - hanya 5xx sementara yang diulang, sekali; 429 (kuota) langsung dikembalikan ke user
+    # - Retry-After diabaikan: jeda cuma backoff kecil, script tidak tertahan melewati timeout
+    retry = Retry(
+        total=2,
+        connect=2,
+        read=0,
+        status=1,
+        backoff_factor=0.3,
+        status_forcelist=[500, 502, 503, 504],
+        allowed_methods=frozenset({"POST"}),
+        respect_retry_after_header=False,
+        raise_on_status=False,
+    )
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retry))
+    return session
+
+GOOGLE_API_KEY = st.secrets.get("GOOGLE_API_KEY", None)
+MODEL = "gemini-2.5-flash"
+AI_CACHE_VERSION = 1  # naikkan untuk membuang jawaban AI lama di cache disk
+
+@st.cache_data(persist="disk", show_spinner=False)
+def generate_gemini(prompt, model=MODEL, version=AI_CACHE_VERSION, _chunks=None):
+    """Jawaban Gemini untuk satu prompt, di-cache ke disk (bertahan lintas sesi & restart).
+
+    Kunci cache = (prompt, model, version); `version` sengaja tanpa awalan "_" karena
+    argumen ber-underscore tidak ikut di-hash oleh Streamlit.
+    Jawaban di-stream (SSE); tiap potongan teks dimasukkan ke queue `_chunks` supaya UI bisa
+    menampilkannya selagi model masih menulis. Saat cache hit fungsi ini tidak jalan sama sekali.
+    Error di-raise (tidak di-return) supaya respons gagal tidak ikut tersimpan di cache.
+    """
+    import json
+    from requests import ConnectionError, ReadTimeout
+    from urllib3.exceptions import ReadTimeoutError
+
+    # API key lewat header, bukan query string: URL ikut tercetak di pesan error requests/urllib3
+    url = f"https://generativelanguage.googleapis.com/v1beta/models/{model}:streamGenerateContent?alt=sse"
+    headers = {"Content-Type": "application/json", "x-goog-api-key": GOOGLE_API_KEY}
+    payload = {"contents": [{"parts": [{"text": prompt}]}]}
+    pieces = []
+    with get_http().post(
+        url, headers=headers, json=payload,
+        timeout=(5, 30), stream=True,  # (connect, read); read = jeda maksimum antar potongan
+    ) as res:
+        if not res.ok:
+            _ = res.content  # baca body error selagi koneksi masih terbuka (dipakai di pesan error)
+            res.raise_for_status()
+        res.encoding = "utf-8"
+        try:
+            for line in res.iter_lines(decode_unicode=True):
+                if not line.startswith("data:"):
+                    continue
+                candidate = json.loads(line[len("data:"):])["candidates"][0]
+                text = "".join(part.get("text", "") for part in candidate.get("content", {}).get("parts", []))
+                if text:
+                    pieces.append(text)
+                    if _chunks is not None:
+                        _chunks.put(text)
+        except ConnectionError as e:
+            # Read timeout di tengah stream dibungkus requests sebagai ConnectionError -> jadikan Timeout lagi
+            if e.args and isinstance(e.args[0], ReadTimeoutError):
+                raise ReadTimeout(e.args[0]) from e
+            raise
+    if not pieces:
+        raise KeyError("candidates")
+    return "".join(pieces)
+
 try:
-    SUPABASE_URL = st.secrets["SUPABASE_URL"]
-    SUPABASE_KEY = st.secrets["SUPABASE_KEY"]
-    supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+    supabase = get_supabase()
 except Exception as e:
     st.error(f"❌ Gagal konek ke Supabase: {e}")
     st.stop()
 
 # =======================================================================
-# 3️⃣ DATA KARYAWAN
+# 3️⃣ DATA KARYAWAN & HASIL MATCH (CACHED)
 # =======================================================================
-@st.cache_data(ttl=3600)
-def get_employees():
-    res = supabase.table("employees").select("employee_id, fullname").execute()
-    if res.data:
-        return {emp["employee_id"]: emp["fullname"] for emp in sorted(res.data, key=lambda x: x["fullname"])}
-    return {}
-
-employees = get_employees()
-if not employees:
-    st.error("❌ Tidak ada data karyawan. Periksa tabel 'employees'.")
-    st.stop()
+@st.cache_data(ttl=60, show_spinner=False)
+def search_employees(query, limit=20):
+    """Maksimal `limit` karyawan (id -> nama) yang namanya mengandung `query`.
+
+    Filter & urutan dikerjakan Postgres (ILIKE + index trigram), jadi yang dikirim ke
+    browser selalu sebatas satu halaman hasil, berapa pun jumlah karyawan.
+    """
+    res = (
+        supabase.table("employees")
+        .select("employee_id, fullname")
+        .ilike("fullname", f"%{query}%")
+        .order("fullname")
+        .limit(limit)
+        .execute()
+    )
+    return {emp["employee_id"]: emp["fullname"] for emp in res.data}
+
+RANKED_COLUMNS = [
+    "employee_id", "fullname", "directorate", "position_name", "grade", "final_match_rate"
+]
+TGV_COLUMNS = ["tgv_name", "avg_all", "avg_top"]
+TOP_N_CHART = 10
+TOP_N_TABLE = 20
+
+@st.cache_data(ttl=300, show_spinner=False)
+def fetch_match_results(ids_tuple):
+    """Hasil match untuk satu set karyawan benchmark (tuple terurut = kunci cache).
+
+    Aman di-cache: RPC dipanggil dengan p_benchmark_ids sehingga hanya bergantung pada argumennya
+    (tidak membaca baris talent_benchmarks mana pun; bobot default 1.0).
+    """
+    # Ranking per karyawan & rata-rata TGV sudah diagregasi/diurutkan di Postgres dalam satu RPC,
+    # jadi baris long-form (karyawan x TV) tidak pernah dikirim ke Streamlit. Tabel cukup Top-N
+    # baris; histogram butuh semua karyawan tapi hanya nilai final_match_rate.
+    summary = supabase.rpc("get_talent_match_summary", {
+        "p_benchmark_ids": list(ids_tuple),
+        "p_limit": TOP_N_TABLE,
+        "p_top": TOP_N_CHART,
+    }).execute().data
+    ranked, rates, tgv = summary["ranked"], summary["rates"], summary["tgv"]
+
+    # Kolom & dtype eksplisit -> tidak ada inferensi per sel dari list-of-dict; NULL (LEFT JOIN) jadi 0
+    df_ranked = (
+        pd.DataFrame.from_records(ranked, columns=RANKED_COLUMNS)
+        .fillna({"final_match_rate": 0})
+        # Kolom berkardinalitas rendah -> category (dikirim ke browser sebagai Arrow dictionary)
+        .astype({
+            "final_match_rate": "float64",
+            "directorate": "category", "position_name": "category", "grade": "category",
+        })
+    )
+    tgv_avg = (
+        pd.DataFrame.from_records(tgv, columns=TGV_COLUMNS)
+        .astype({"avg_all": "float64", "avg_top": "float64"})
+        .fillna({"avg_all": 0, "avg_top": 0})
+    )
+    # Satu nilai per karyawan (persen 0-100): float32 cukup & setengah ukuran entri cache
+    all_rates = np.array(rates, dtype=np.float32)
+    return df_ranked, all_rates, tgv_avg
 
 # =======================================================================
 # 4️⃣ FORM INPUT BENCHMARK
 # =======================================================================
+# Pencarian benchmark di luar form supaya hasil ter-update saat mengetik;
+# pilihan (id -> nama) disimpan di session_state agar bertahan lintas pencarian.
+# Satu checkbox per karyawan: pilihan hanya diubah lewat on_change, jadi tidak ada widget
+# yang di-reset ke default basi saat daftar hasil pencarian berubah.
+MAX_BENCHMARK = 3
+st.session_state.setdefault("benchmark", {})
+
+def toggle_benchmark(emp_id, name):
+    if st.session_state[f"pick_{emp_id}"]:
+        st.session_state["benchmark"][emp_id] = name
+    else:
+        st.session_state["benchmark"].pop(emp_id, None)
+
+st.subheader("1️⃣ Employee Benchmarking")
+query = st.text_input("Cari Karyawan", placeholder="Ketik sebagian nama karyawan...")
+try:
+    found = search_employees(query.strip())
+except Exception as e:
+    st.error(f"❌ Gagal mengambil data karyawan: {e}")
+    st.stop()
+
+if not found and not query.strip():
+    st.error("❌ Tidak ada data karyawan. Periksa tabel 'employees'.")
+    st.stop()
+
+benchmark = st.session_state["benchmark"]
+st.caption(f"Pilih Karyawan Benchmark (maksimal {MAX_BENCHMARK}) — terpilih {len(benchmark)}/{MAX_BENCHMARK}")
+# Yang sudah dipilih selalu tampil (di atas), diikuti hasil pencarian yang belum dipilih
+for emp_id, name in {**benchmark, **found}.items():
+    st.checkbox(
+        name,
+        value=emp_id in benchmark,
+        key=f"pick_{emp_id}",
+        on_change=toggle_benchmark,
+        args=(emp_id, name),
+        disabled=emp_id not in benchmark and len(benchmark) >= MAX_BENCHMARK,
+    )
+
 with st.form("form_benchmark"):
-    st.subheader("1️⃣ Role Information")
+    st.subheader("2️⃣ Role Information")
     role_name = st.text_input("Role Name")
     job_level = st.selectbox("Job Level", ["Staff", "Supervisor", "Manager", "Senior Manager"])
     role_purpose = st.text_area("Role Purpose", placeholder="Tujuan utama role...")
 
-    st.subheader("2️⃣ Employee Benchmarking")
-    selected_names = st.multiselect(
-        "Pilih Karyawan Benchmark (maksimal 3)",
-        options=list(employees.values()),
-        max_selections=3
-    )
-
     submit = st.form_submit_button("✨ Find Matches")
 
 # =======================================================================
 # 5️⃣ PROSES BENCHMARK
 # =======================================================================
 if submit:
-    if not (role_name and job_level and role_purpose and selected_names):
+    selected_ids = list(st.session_state["benchmark"])
+    selected_names = list(st.session_state["benchmark"].values())
+    if not (role_name and job_level and role_purpose and selected_ids):
         st.error("Isi semua field dengan benar.")
         st.stop()
 
     st.info("🔄 Memproses data benchmark...")
 
-    id_map = {v: k for k, v in employees.items()}
-    selected_ids = [id_map[n] for n in selected_names]
+    # Simpan benchmark & hitung match bersamaan. Aman hanya karena get_talent_match_summary
+    # dipanggil dengan p_benchmark_ids (selalu list, tidak pernah NULL), sehingga tidak
+    # membaca talent_benchmarks sama sekali -> hasilnya tidak bergantung pada insert ini.
+    # Jangan panggil RPC tanpa p_benchmark_ids di sini: versi itu membaca baris terbaru dan
+    # akan berpacu dengan insert.
+    with ThreadPoolExecutor(max_workers=1) as ex:
+        f_insert = ex.submit(
+            supabase.table("talent_benchmarks").insert({
+                "role_name": role_name,
+                "job_level": job_level,
+                "role_purpose": role_purpose,
+                "selected_talent_ids": selected_ids
+            }, returning="minimal").execute  # baris yang disimpan tidak dipakai -> jangan dikirim balik
+        )
+        try:
+            results, rpc_error = fetch_match_results(tuple(sorted(selected_ids))), None
+        except Exception as e:
+            results, rpc_error = None, e
+        try:
+            f_insert.result()
+            insert_error = None
+        except Exception as e:
+            insert_error = e
+
+    if insert_error is not None:
+        st.error(f"❌ Gagal menyimpan benchmark: {insert_error}")
+        st.stop()
 
-    insert = supabase.table("talent_benchmarks").insert({
+    st.success("✅ Benchmark berhasil disimpan!")
+    # Simpan input yang di-submit: rerun berikutnya (mis. klik tombol AI) tetap menampilkan
+    # hasil yang sama tanpa insert ulang; isi form yang belum di-submit tidak ikut terpakai
+    st.session_state["last_run"] = {
         "role_name": role_name,
         "job_level": job_level,
         "role_purpose": role_purpose,
-        "selected_talent_ids": selected_ids
-    }).execute()
-
-    if not insert.data:
-        st.error("❌ Gagal menyimpan benchmark.")
-        st.stop()
+        "selected_ids": selected_ids,
+        "selected_names": selected_names,
+    }
+    st.session_state["ai_requested"] = False
 
-    st.success("✅ Benchmark berhasil disimpan!")
-    st.write(f"**Role:** {role_name} ({job_level})")
-    st.write(f"**Purpose:** {role_purpose}")
-    st.write(f"**Benchmark:** {', '.join(selected_names)}")
+run = st.session_state.get("last_run")
+if run is None:
+    st.stop()
+role_name, job_level, role_purpose = run["role_name"], run["job_level"], run["role_purpose"]
 
-    # ===================================================================
-    # 6️⃣ PANGGIL FUNCTION SUPABASE
-    # ===================================================================
+if not submit:
+    # Rerun tanpa submit -> ambil dari cache fetch_match_results (tanpa round-trip selama TTL)
     try:
-        data = supabase.rpc("get_talent_match_results").execute()
-        df = pd.DataFrame(data.data)
+        results, rpc_error = fetch_match_results(tuple(sorted(run["selected_ids"]))), None
     except Exception as e:
-        st.error(f"❌ Error function SQL: {e}")
-        st.stop()
+        results, rpc_error = None, e
 
-    if df.empty:
-        st.warning("⚠️ Tidak ada hasil match ditemukan.")
-        st.stop()
+st.write(f"**Role:** {role_name} ({job_level})")
+st.write(f"**Purpose:** {role_purpose}")
+st.write(f"**Benchmark:** {', '.join(run['selected_names'])}")
 
-    # ===================================================================
-    # 7️⃣ TAMPILKAN HASIL LENGKAP
-    # ===================================================================
-    st.subheader("🏆 Ranked Talent List (Top Matches)")
-
-    # Pastikan nama kolom lowercase agar konsisten
-    df.columns = [c.strip().lower() for c in df.columns]
-
-    expected_columns = [
-        "employee_id", "fullname", "directorate", "position_name", "grade",
-        "tgv_name", "tv_name", "baseline_score", "user_score",
-        "tv_match_rate", "tgv_match_rate", "final_match_rate"
-    ]
-
-    # Jika kolom tidak sesuai, tampilkan info untuk debugging
-    missing_cols = [c for c in expected_columns if c not in df.columns]
-    if missing_cols:
-        st.warning(f"⚠️ Kolom berikut tidak ditemukan di hasil SQL: {missing_cols}")
-
-    df_sorted = df.sort_values("final_match_rate", ascending=False)
-    st.dataframe(df_sorted[expected_columns], use_container_width=True)
-
-    # ===================================================================
-    # 8️⃣ VISUALISASI
-    # ===================================================================
-    st.subheader("📊 Dashboard Match Overview")
-    col1, col2 = st.columns(2)
-
-    with col1:
-        st.write("Distribusi Final Match Rate")
-        fig, ax = plt.subplots()
-        sns.histplot(df_sorted["final_match_rate"], bins=10, kde=True, color="skyblue", ax=ax)
-        st.pyplot(fig)
-
-    with col2:
-        st.write("Rata-rata TGV Match (Top 10 Talent)")
-        if "tgv_name" in df.columns:
-            top_10 = df_sorted.head(10)["employee_id"]
-            df_top10 = df[df["employee_id"].isin(top_10)]
-            avg_tgv = df_top10.groupby("tgv_name")["tgv_match_rate"].mean().reset_index()
-            fig2, ax2 = plt.subplots()
-            sns.barplot(data=avg_tgv, y="tgv_name", x="tgv_match_rate", ax=ax2)
-            st.pyplot(fig2)
-
-    # ===================================================================
-    # 9️⃣ FITUR AI GOOGLE GEMINI 2.5
-    # ===================================================================
-    st.subheader("🤖 AI Talent Insights")
-
-    GOOGLE_API_KEY = st.secrets.get("GOOGLE_API_KEY", None)
-    MODEL = "gemini-2.5-flash"
-
-    def call_gemini(prompt):
-        if not GOOGLE_API_KEY:
-            return "[AI Error: GOOGLE_API_KEY tidak ditemukan]"
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/{MODEL}:generateContent?key={GOOGLE_API_KEY}"
-        payload = {"contents": [{"parts": [{"text": prompt}]}]}
-        res = requests.post(url, headers={"Content-Type": "application/json"}, json=payload)
-        if res.status_code != 200:
-            return f"[AI Error {res.status_code}] {res.text}"
-        data = res.json()
-        try:
-            return data["candidates"][0]["content"]["parts"][0]["text"]
-        except:
-            return "[AI tidak mengembalikan hasil]"
+# =======================================================================
+# 6️⃣ PANGGIL FUNCTION SUPABASE
+# =======================================================================
+if rpc_error is not None:
+    st.error(f"❌ Error function SQL: {rpc_error}")
+    st.stop()
 
-    # Siapkan konteks AI
-    top_candidates = df_sorted.head(3).to_dict("records")
-    tgv_summary = df.groupby("tgv_name")["tgv_match_rate"].mean().sort_values(ascending=False).to_dict()
+df_ranked, all_rates, tgv_avg = results
 
-    tgv_text = "\n".join([f"- {k}: {v:.1f}%" for k, v in tgv_summary.items()])
-    candidates_text = "\n".join([f"{i+1}. {c['fullname']} ({c['final_match_rate']:.1f}%)" for i, c in enumerate(top_candidates)])
+if df_ranked.empty:
+    st.warning("⚠️ Tidak ada hasil match ditemukan.")
+    st.stop()
 
-    prompt_profile = f"""
-Buatkan profil pekerjaan untuk role {role_name} dengan tujuan {role_purpose}.
-Gunakan data berikut:
-{tgv_text}
-Tuliskan dalam 3 bagian:
-1. Job Requirements
-2. Job Description
-3. Key Competencies
-"""
+# =======================================================================
+# 7️⃣ TAMPILKAN HASIL LENGKAP
+# =======================================================================
+st.subheader(f"🏆 Ranked Talent List (Top {TOP_N_TABLE} Matches)")
+
+# df_ranked sudah Top-N, kolom RANKED_COLUMNS & dtype ringkas dari fetch_match_results -> kirim apa adanya;
+# bar match rate digambar browser (ProgressColumn), bukan string yang dibentuk per baris di Python
+st.dataframe(
+    df_ranked,
+    use_container_width=True,
+    column_config={
+        "final_match_rate": st.column_config.ProgressColumn(
+            "final_match_rate", format="%.1f%%", min_value=0, max_value=100
+        )
+    },
+)
 
-    prompt_formula = f"""
-Dari data TGV berikut:
-{tgv_text}
-Buatkan rumus 'Success Formula' dengan bobot yang masuk akal seperti:
-SuccessScore = 0.4*TGV_A + 0.3*TGV_B + 0.3*TGV_C
-Sertakan penjelasan singkat.
-"""
+# =======================================================================
+# 8️⃣ VISUALISASI
+# =======================================================================
+st.subheader("📊 Dashboard Match Overview")
+col1, col2 = st.columns(2)
+
+# Chart native Streamlit (Vega-Lite, dirender di browser): tanpa matplotlib/seaborn di server
+with col1:
+    st.write("Distribusi Final Match Rate")
+    # Binning sekali dengan NumPy -> hanya 10 baris yang dikirim ke browser
+    counts, edges = np.histogram(all_rates, bins=10)
+    hist = pd.DataFrame({"jumlah karyawan": counts}, index=pd.Index(edges[:-1].round(1), name="final_match_rate"))
+    st.bar_chart(hist)
+
+with col2:
+    st.write(f"Rata-rata TGV Match (Top {TOP_N_CHART} Talent)")
+    if not tgv_avg.empty:
+        st.bar_chart(tgv_avg.set_index("tgv_name")["avg_top"], horizontal=True)
 
-    prompt_candidates = f"""
-Berikut 3 kandidat terbaik:
-{candidates_text}
-Berikan alasan singkat dan mendalam kenapa mereka cocok untuk role {role_name}.
-"""
+# =======================================================================
+# 9️⃣ FITUR AI GOOGLE GEMINI 2.5
+# =======================================================================
+st.subheader("🤖 AI Talent Insights")
 
-    with st.expander("🧠 AI-Generated Job Profile", expanded=True):
-        st.write(call_gemini(prompt_profile))
+# Panggilan AI hanya setelah diminta; rerun lain (lihat tabel, dsb.) tidak menunggu Gemini
+if st.button("🤖 Generate AI Insights"):
+    st.session_state["ai_requested"] = True
+if not st.session_state.get("ai_requested"):
+    st.caption("Klik tombol di atas untuk membuat insight AI berdasarkan hasil match ini.")
+    st.stop()
+
+def call_gemini(prompt, on_chunk=None):
+    """Teks jawaban (atau pesan error); `on_chunk(potongan_baru)` dipanggil selama streaming."""
+    if not GOOGLE_API_KEY:
+        return "[AI Error: GOOGLE_API_KEY tidak ditemukan]"
+    import queue
+    from requests import HTTPError, RequestException, Timeout
 
-    with st.expander("⚖️ AI Success Formula"):
-        st.write(call_gemini(prompt_formula))
+    chunks = queue.Queue()
+    try:
+        # generate_gemini jalan di worker & hanya mengisi queue; elemen st diperbarui dari
+        # thread ini (fungsi cache tidak boleh menulis ke placeholder yang dibuat di luar)
+        with ThreadPoolExecutor(max_workers=1) as ex:
+            future = ex.submit(generate_gemini, prompt, _chunks=chunks)
+            while not (future.done() and chunks.empty()):
+                try:
+                    chunk = chunks.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if on_chunk is not None:
+                    on_chunk(chunk)
+            return future.result()
+    except Timeout:
+        return "[AI Timeout: Gemini tidak merespons tepat waktu]"
+    except HTTPError as e:
+        return f"[AI Error {e.response.status_code}] {e.response.text[:1000]}"
+    except RequestException:
+        # Gagal konek / stream terputus. Pesan tetap: teks exception bisa memuat detail request
+        return "[AI Error: gagal konek ke Gemini]"
+    except (KeyError, IndexError, TypeError, ValueError):
+        # Struktur respons tak terduga atau baris SSE bukan JSON valid
+        return "[AI tidak mengembalikan hasil]"
+
+# Siapkan konteks AI
+# Baca langsung kolom yang dipakai, tanpa to_dict per baris; tgv_avg sudah terurut dari server
+top_candidates = df_ranked[["fullname", "final_match_rate"]].head(3).itertuples(index=False)
+
+tgv_text = "\n".join(f"- {k}: {v:.1f}%" for k, v in zip(tgv_avg["tgv_name"], tgv_avg["avg_all"]))
+candidates_text = "\n".join(f"{i+1}. {c.fullname} ({c.final_match_rate:.1f}%)" for i, c in enumerate(top_candidates))
+
+# Satu prompt gabungan: konteks (role, TGV, kandidat) dikirim sekali, bukan diulang 3x
+SECTION_SEP = "<<<SEP>>>"
+prompt_insights = f"""
+Konteks role: {role_name} dengan tujuan {role_purpose}.
+Rata-rata TGV match:
+{tgv_text}
+3 kandidat terbaik:
+{candidates_text}
 
-    with st.expander("🏆 AI Candidate Insights"):
-        st.write(call_gemini(prompt_candidates))
+Tuliskan TIGA bagian berikut secara berurutan dan pisahkan antar bagian HANYA dengan baris {SECTION_SEP}
+(tanpa judul bagian tambahan):
+1. Profil pekerjaan untuk role {role_name} dalam 3 sub-bagian: Job Requirements, Job Description, Key Competencies.
+2. Rumus 'Success Formula' dari data TGV di atas dengan bobot yang masuk akal seperti:
+   SuccessScore = 0.4*TGV_A + 0.3*TGV_B + 0.3*TGV_C
+   Sertakan penjelasan singkat.
+3. Alasan singkat dan mendalam kenapa 3 kandidat di atas cocok untuk role {role_name}.
+"""
 
-    st.success("✅ Semua fitur berjalan dengan baik!")
+# Kerangka expander dirender dulu (placeholder), baru diisi setelah jawaban datang,
+# sehingga layout halaman tidak tertahan oleh satu panggilan AI
+with st.expander("🧠 AI-Generated Job Profile", expanded=True):
+    slot_profile = st.empty()
+with st.expander("⚖️ AI Success Formula"):
+    slot_formula = st.empty()
+with st.expander("🏆 AI Candidate Insights"):
+    slot_candidates = st.empty()
+for slot in (slot_profile, slot_formula, slot_candidates):
+    slot.caption("⏳ Menunggu Gemini...")
+
+slots = (slot_profile, slot_formula, slot_candidates)
+stream = {"section": 0, "buffer": "", "shown": ""}
+
+def show_chunk(chunk):
+    # Selama streaming hanya bagian yang sedang menerima teks yang ditulis ulang;
+    # bagian yang sudah ditutup separator ditulis final sekali lalu tidak disentuh lagi
+    stream["buffer"] += chunk
+    while SECTION_SEP in stream["buffer"]:
+        done, stream["buffer"] = stream["buffer"].split(SECTION_SEP, 1)
+        if not done.strip():
+            # Bagian kosong (separator di awal atau ganda) dilewati, sama seperti split akhir
+            continue
+        if stream["section"] < len(slots):
+            slots[stream["section"]].write(done.strip())
+        stream["section"] += 1
+        stream["shown"] = ""
+    visible = stream["buffer"]
+    # Tahan ekor yang bisa jadi awal separator (mis. "<<<SE") sampai potongan berikutnya datang
+    for k in range(min(len(SECTION_SEP) - 1, len(visible)), 0, -1):
+        if visible.endswith(SECTION_SEP[:k]):
+            visible = visible[:-k]
+            break
+    visible = visible.strip()
+    if stream["section"] < len(slots) and visible and visible != stream["shown"]:
+        slots[stream["section"]].write(visible)
+        stream["shown"] = visible
+
+ai_text = call_gemini(prompt_insights, on_chunk=show_chunk)
+
+# Bagian kosong (mis. separator di awal/akhir atau ganda) dibuang dulu sebelum dihitung
+sections = [part.strip() for part in ai_text.split(SECTION_SEP) if part.strip()]
+if len(sections) != 3:
+    # Pesan error / model tidak mengikuti format -> tampilkan utuh di bagian pertama
+    sections = [ai_text, "_(lihat AI-Generated Job Profile)_", "_(lihat AI-Generated Job Profile)_"]
+for slot, text in zip(slots, sections):
+    slot.write(text)
+
+st.success("✅ Semua fitur berjalan dengan baik!")